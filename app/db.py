@@ -6,10 +6,13 @@ from fastapi import HTTPException
 from fastapi.encoders import jsonable_encoder
 from sqlalchemy import MetaData, create_engine, inspect, select, Column, Integer, String, Float, Date, Boolean, update
 from sqlalchemy.orm import Session, sessionmaker
+from sqlalchemy.pool import QueuePool
 from sqlalchemy.testing.schema import Table
 import sqlalchemy as sa
 
+from app.metrics import timed_stage, record_cache_lookup, record_table_rows
 from app.schemas.response_models import TableStructureResponse
+from app.slow_query import register_slow_query_log
 
 load_dotenv()
 
@@ -17,7 +20,15 @@ DB_URL = os.environ.get('DB_URL')
 DB_USER = os.environ.get('DB_USER')
 DB_PASSWORD = os.environ.get('DB_PASSWORD')
 
-engine = create_engine(f"postgresql://{DB_USER}:{DB_PASSWORD}@{DB_URL}/db-3s")
+class TimedQueuePool(QueuePool):
+    def _do_get(self):
+        # Covers waiting for a free connection as well as opening a new one
+        with timed_stage('pool_checkout'):
+            return super()._do_get()
+
+
+engine = create_engine(f"postgresql://{DB_USER}:{DB_PASSWORD}@{DB_URL}/db-3s", poolclass=TimedQueuePool)
+register_slow_query_log(engine)
 
 metadata = MetaData()
 
@@ -32,10 +43,16 @@ def get_db() -> Generator:
         db.close()
 
 
+def reflect_table(table_name: str, schema_name: str, bind=engine) -> Table:
+    # Tables already present in the shared metadata are returned without hitting the database again
+    record_cache_lookup('table_reflection', f"{schema_name}.{table_name}" in metadata.tables)
+    with timed_stage('reflection'):
+        return Table(table_name, metadata, autoload_with=bind, schema=schema_name)
+
+
 def get_public_schemas(db: Session) -> List[str]:
     try:
-        ground_data_schema_table = Table('ground_data_schema_dictionary', metadata, autoload_with=engine,
-                                         schema='public')
+        ground_data_schema_table = reflect_table('ground_data_schema_dictionary', 'public')
         query = select(ground_data_schema_table.c.schema_name)
         result = db.execute(query)
         public_schemas = [row['schema_name'] for row in result.mappings().all()]  # Access by column name
@@ -99,7 +116,7 @@ def get_data_for_table(
         limit: int = None
 ) -> Dict[str, Any]:
     try:
-        table = Table(table_name, metadata, autoload_with=engine, schema=schema_name)
+        table = reflect_table(table_name, schema_name)
         primary_key_column = get_primary_key_column(table)
         filter_column = primary_key_column or get_first_column_name(table)
         if not filter_column:
@@ -112,12 +129,17 @@ def get_data_for_table(
             query = query.limit(limit)
         if primary_key_value:
             query = query.where(getattr(table.c, filter_column) == primary_key_value)
-        result = db.execute(query)
-        rows = result.fetchall()
-        columns = result.keys()
-        if rows:
+        with timed_stage('query'):
+            result = db.execute(query)
+        with timed_stage('materialize'):
+            rows = result.fetchall()
+            columns = result.keys()
             data_dicts = [dict(zip(columns, row)) for row in rows]
-            return {"table_name": table_name, "data": jsonable_encoder(data_dicts)}
+        record_table_rows(schema_name, table_name, len(rows))
+        if rows:
+            with timed_stage('encode'):
+                data = jsonable_encoder(data_dicts)
+            return {"table_name": table_name, "data": data}
         else:
             return {"table_name": table_name, "data": []}
     except Exception as e:
@@ -132,7 +154,7 @@ def add_data_to_table(
         data: Union[Dict[str, Any], List[Dict[str, Any]]],
 ):
     try:
-        table = Table(table_name, metadata, autoload_with=engine, schema=schema_name)
+        table = reflect_table(table_name, schema_name)
     except Exception as e:
         raise HTTPException(status_code=404, detail=f"Table '{table_name}' not found in schema '{schema_name}'."
                                                     f"Error: {e}")
@@ -143,7 +165,8 @@ def add_data_to_table(
             if key not in table.columns.keys():
                 raise HTTPException(status_code=400, detail=f"Column '{key}' not found in table '{table_name}'.")
     try:
-        db.execute(table.insert(), data)
+        with timed_stage('query'):
+            db.execute(table.insert(), data)
         db.commit()
     except Exception as e:
         db.rollback()
@@ -231,7 +254,7 @@ def update_row(
     update_data: Dict[str, Any]
 ):
     try:
-        table = Table(table_name, metadata, autoload_with=db.bind, schema=schema_name)
+        table = reflect_table(table_name, schema_name, bind=db.bind)
     except Exception as e:
         raise HTTPException(status_code=404, detail=f"Table '{table_name}' not found in schema '{schema_name}'. "
                                                     f"Error: {e}")
@@ -249,7 +272,8 @@ def update_row(
             .where(getattr(table.c, filter_column) == row_id)
             .values(update_data)
         )
-        db.execute(stmt)
+        with timed_stage('query'):
+            db.execute(stmt)
         db.commit()
     except Exception as e:
         db.rollback()
@@ -260,7 +284,7 @@ def update_row(
 
 def delete_table(db: Session, schema_name: str, table_name: str):
     try:
-        table = Table(table_name, metadata, autoload_with=db.bind, schema=schema_name)
+        table = reflect_table(table_name, schema_name, bind=db.bind)
     except Exception as e:
         raise HTTPException(status_code=404, detail=f"Table '{table_name}' not found"
                                                     f"in schema '{schema_name}'. Error: {e}")
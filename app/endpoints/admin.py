@@ -0,0 +1,27 @@
+from typing import Literal
+
+from fastapi import APIRouter, Depends, Query
+
+from app.metrics import TimedRoute
+from app.schemas.response_models import SlowQueryResponse, RemoveDataResponse
+from app.schemas.user import SystemUser
+from app.slow_query import slow_query_log, SLOW_QUERY_THRESHOLD_MS
+from app.utils import get_admin_user
+
+router = APIRouter(route_class=TimedRoute)
+
+
+@router.get("/slow-queries", response_model=SlowQueryResponse)
+def read_slow_queries(
+    limit: int = Query(20, ge=1, le=500, description="Limit the number of fingerprints returned"),
+    order_by: Literal["total_ms", "max_ms", "mean_ms", "count"] = Query(
+        "total_ms", description="Field to rank the fingerprints by"),
+    current_user: SystemUser = Depends(get_admin_user)
+):
+    return {"threshold_ms": SLOW_QUERY_THRESHOLD_MS, "queries": slow_query_log.top(limit, order_by)}
+
+
+@router.delete("/slow-queries", response_model=RemoveDataResponse)
+def reset_slow_queries(current_user: SystemUser = Depends(get_admin_user)):
+    slow_query_log.reset()
+    return {"message": "Slow query log cleared"}
@@ -8,8 +8,9 @@ from starlette import status
 from app.security import get_hashed_password, verify_password, create_access_token
 
 from app.db import get_db, metadata, engine
+from app.metrics import TimedRoute
 from app.utils import get_current_user
-router = APIRouter()
+router = APIRouter(route_class=TimedRoute)
 
 #credits for the base go to https://www.freecodecamp.org/news/how-to-add-jwt-authentication-in-fastapi/
 @router.post('/signup', summary="Create new user", response_model=UserOut)
@@ -0,0 +1,119 @@
+import os
+import re
+from typing import BinaryIO, Iterator
+
+from fastapi import APIRouter, Depends, HTTPException, Header
+from fastapi.responses import StreamingResponse
+from sqlalchemy.orm import Session
+from starlette import status
+
+from app.db import get_db, get_public_schemas, validate_schema_access, reflect_table
+from app.metrics import TimedRoute
+from app.exports import export_manager, COMPLETED, EXPIRED
+from app.schemas.request_models import ExportRequest
+from app.schemas.response_models import ExportJobResponse, ExportJobsResponse
+from app.schemas.user import SystemUser
+from app.utils import get_current_user
+
+router = APIRouter(route_class=TimedRoute)
+
+CHUNK_SIZE = 1024 * 1024
+RANGE_PATTERN = re.compile(r"bytes=(\d*)-(\d*)$")
+
+
+@router.post("", response_model=ExportJobResponse, status_code=status.HTTP_202_ACCEPTED)
+def create_export(
+    request: ExportRequest,
+    db: Session = Depends(get_db),
+    current_user: SystemUser = Depends(get_current_user)
+):
+    public_schemas = get_public_schemas(db)
+    validate_schema_access(request.schema_name, public_schemas)
+    try:
+        table = reflect_table(request.table_name, request.schema_name)
+    except Exception as e:
+        raise HTTPException(status_code=404, detail=f"Table '{request.table_name}' not found in schema "
+                                                    f"'{request.schema_name}'. Error: {e}")
+    for key in request.filters.keys():
+        if key not in table.columns.keys():
+            raise HTTPException(status_code=400, detail=f"Column '{key}' not found in table '{request.table_name}'.")
+
+    job = export_manager.submit(request.schema_name, request.table_name, request.filters, request.format,
+                                current_user.user_id)
+    return job.to_dict()
+
+
+@router.get("", response_model=ExportJobsResponse)
+def read_exports(current_user: SystemUser = Depends(get_current_user)):
+    return {"jobs": [job.to_dict() for job in export_manager.list_jobs(current_user.user_id)]}
+
+
+@router.get("/{job_id}", response_model=ExportJobResponse)
+def read_export(job_id: str, current_user: SystemUser = Depends(get_current_user)):
+    job = export_manager.get(job_id, current_user.user_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail=f"Export job '{job_id}' not found.")
+    return job.to_dict()
+
+
+def _read_file(export_file: BinaryIO, start: int, length: int) -> Iterator[bytes]:
+    with export_file:
+        export_file.seek(start)
+        while length > 0:
+            chunk = export_file.read(min(CHUNK_SIZE, length))
+            if not chunk:
+                break
+            length -= len(chunk)
+            yield chunk
+
+
+@router.get("/{job_id}/download")
+def download_export(
+    job_id: str,
+    range_header: str = Header(None, alias="Range"),
+    current_user: SystemUser = Depends(get_current_user)
+):
+    job = export_manager.get(job_id, current_user.user_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail=f"Export job '{job_id}' not found.")
+    if job.status == EXPIRED:
+        raise HTTPException(status_code=410, detail=f"The result of export job '{job_id}' has expired.")
+    if job.status != COMPLETED:
+        raise HTTPException(status_code=409, detail=f"Export job '{job_id}' is {job.status}.")
+    # Open the file up front, an open handle stays readable even if the sweep removes the file meanwhile
+    try:
+        export_file = open(job.path, 'rb')
+    except OSError:
+        raise HTTPException(status_code=410, detail=f"The result of export job '{job_id}' has expired.")
+    file_size = os.fstat(export_file.fileno()).st_size
+
+    headers = {
+        "Accept-Ranges": "bytes",
+        "Content-Disposition": f'attachment; filename="{job.filename}"',
+    }
+    start, end = 0, file_size - 1
+    status_code = status.HTTP_200_OK
+    # Only a single byte range is supported, which is what download managers use to resume. Range headers
+    # that cannot be parsed are ignored and the full file is sent, as RFC 9110 prescribes
+    match = RANGE_PATTERN.match(range_header.strip()) if range_header else None
+    if match is not None and (match.group(1) or match.group(2)):
+        if match.group(1):
+            range_start = int(match.group(1))
+            range_end = min(int(match.group(2)), file_size - 1) if match.group(2) else file_size - 1
+        else:
+            range_start = max(file_size - int(match.group(2)), 0) if int(match.group(2)) else file_size
+            range_end = file_size - 1
+        if range_start >= file_size:
+            export_file.close()
+            raise HTTPException(status_code=status.HTTP_416_REQUESTED_RANGE_NOT_SATISFIABLE,
+                                detail="Requested range not satisfiable.",
+                                headers={"Content-Range": f"bytes */{file_size}"})
+        if range_start <= range_end:
+            start, end = range_start, range_end
+            status_code = status.HTTP_206_PARTIAL_CONTENT
+            headers["Content-Range"] = f"bytes {start}-{end}/{file_size}"
+
+    length = end - start + 1
+    headers["Content-Length"] = str(length)
+    return StreamingResponse(_read_file(export_file, start, length), status_code=status_code,
+                             media_type="application/gzip", headers=headers)
@@ -6,9 +6,10 @@ from sqlalchemy.orm import Session
 
 from app.db import get_db, get_schemas_and_tables, get_tables_for_schema, get_data_for_table, \
     get_public_schemas, validate_schema_access
+from app.metrics import timed_stage, TimedRoute
 
 from app.schemas.response_models import SchemaResponse, TablesResponse, TableDataResponse
-router = APIRouter()
+router = APIRouter(route_class=TimedRoute)
 
 
 @router.get("/schemas", response_model=SchemaResponse)
@@ -21,8 +22,9 @@ def read_public_schemas(db: Session = Depends(get_db)):
 
 @router.get("/schemas/{schema_name}/tables", response_model=TablesResponse)
 def read_tables_for_schema(schema_name: str, db: Session = Depends(get_db)):
-    public_schemas = get_public_schemas(db)
-    validate_schema_access(schema_name, public_schemas)
+    with timed_stage('schema_validation'):
+        public_schemas = get_public_schemas(db)
+        validate_schema_access(schema_name, public_schemas)
     schemas_and_tables = get_schemas_and_tables(public_schemas)
     return get_tables_for_schema(schema_name, schemas_and_tables)
 
@@ -35,6 +37,7 @@ def get_table_data(
     limit: int = Query(None, description="Limit the number of rows returned"),
     db: Session = Depends(get_db),
 ):
-    public_schemas = get_public_schemas(db)
-    validate_schema_access(schema_name, public_schemas)
+    with timed_stage('schema_validation'):
+        public_schemas = get_public_schemas(db)
+        validate_schema_access(schema_name, public_schemas)
     return get_data_for_table(db, schema_name, table_name, primary_key_value, limit)
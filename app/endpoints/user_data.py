@@ -5,13 +5,14 @@ from sqlalchemy.orm import Session
 
 from app.db import get_db, create_table_for_schema, get_schemas_and_tables, \
     get_tables_for_schema, get_data_for_table, get_table_structure, add_data_to_table, delete_table, update_row
+from app.metrics import TimedRoute
 from app.schemas.response_models import TablesResponse, TableDataResponse, TableStructureResponse, AddDataResponse, \
     RemoveDataResponse, UpdateDataResponse
 from app.schemas.user import SystemUser
 from app.schemas.request_models import TableCreateRequest, RowUpdateRequest
 from app.utils import get_current_user
 
-router = APIRouter()
+router = APIRouter(route_class=TimedRoute)
 
 
 @router.post("/tables")
@@ -0,0 +1,312 @@
+import csv
+import gzip
+import hashlib
+import json
+import logging
+import os
+import tempfile
+import threading
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from datetime import date, datetime, timezone
+from datetime import time as dt_time
+from decimal import Decimal
+from typing import Any, Dict, List, Optional, Set
+
+from dotenv import load_dotenv
+from sqlalchemy import select, text
+
+from app.db import SessionLocal, reflect_table
+from app.metrics import timed_stage
+
+load_dotenv()
+
+logger = logging.getLogger(__name__)
+
+EXPORT_DIR = os.environ.get('EXPORT_DIR', os.path.join(tempfile.gettempdir(), '3s-exports'))
+EXPORT_WORKERS = int(os.environ.get('EXPORT_WORKERS', '2'))
+EXPORT_BATCH_SIZE = int(os.environ.get('EXPORT_BATCH_SIZE', '5000'))
+EXPORT_RESULT_TTL_SECONDS = int(os.environ.get('EXPORT_RESULT_TTL_SECONDS', str(24 * 60 * 60)))
+EXPORT_GC_INTERVAL_SECONDS = int(os.environ.get('EXPORT_GC_INTERVAL_SECONDS', '600'))
+# Level 9 is several times slower than 6 for a few percent smaller files, too costly inside the API process
+EXPORT_COMPRESSLEVEL = int(os.environ.get('EXPORT_COMPRESSLEVEL', '6'))
+
+EXPORT_FORMATS = {
+    'csv': '.csv.gz',
+    'ndjson': '.ndjson.gz',
+}
+
+QUEUED = 'queued'
+RUNNING = 'running'
+COMPLETED = 'completed'
+FAILED = 'failed'
+EXPIRED = 'expired'
+
+
+class ExportCancelled(Exception):
+    pass
+
+
+class ExportJob:
+    def __init__(
+            self,
+            key: str,
+            schema_name: str,
+            table_name: str,
+            filters: Dict[str, Any],
+            export_format: str,
+            user_id: int
+    ):
+        self.job_id = uuid.uuid4().hex
+        self.key = key
+        # Users that submitted this export, a deduplicated submission adds its user here
+        self.owners: Set[int] = {user_id}
+        self.schema_name = schema_name
+        self.table_name = table_name
+        self.filters = filters
+        self.format = export_format
+        self.status = QUEUED
+        self.rows_written = 0
+        self.total_rows_estimate: Optional[int] = None
+        self.size_bytes: Optional[int] = None
+        self.error: Optional[str] = None
+        self.created_at = datetime.now(timezone.utc)
+        self.started_at: Optional[datetime] = None
+        self.finished_at: Optional[datetime] = None
+
+    @property
+    def path(self) -> str:
+        return os.path.join(EXPORT_DIR, f"{self.job_id}{EXPORT_FORMATS[self.format]}")
+
+    @property
+    def filename(self) -> str:
+        return f"{self.schema_name}.{self.table_name}{EXPORT_FORMATS[self.format]}"
+
+    @property
+    def progress(self) -> Optional[float]:
+        if self.status == COMPLETED:
+            return 1.0
+        if not self.total_rows_estimate:
+            return None
+        # The estimate comes from planner statistics and can be lower than the real row count
+        return min(self.rows_written / self.total_rows_estimate, 0.99)
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            'job_id': self.job_id,
+            'status': self.status,
+            'schema_name': self.schema_name,
+            'table_name': self.table_name,
+            'filters': self.filters,
+            'format': self.format,
+            'rows_written': self.rows_written,
+            'total_rows_estimate': self.total_rows_estimate,
+            'progress': self.progress,
+            'size_bytes': self.size_bytes,
+            'error': self.error,
+            'created_at': self.created_at,
+            'started_at': self.started_at,
+            'finished_at': self.finished_at,
+        }
+
+
+def export_key(schema_name: str, table_name: str, filters: Dict[str, Any], export_format: str) -> str:
+    payload = json.dumps([schema_name, table_name, filters, export_format], sort_keys=True, default=str)
+    return hashlib.sha1(payload.encode('utf-8')).hexdigest()
+
+
+def _json_default(value: Any) -> Any:
+    if isinstance(value, (datetime, date, dt_time)):
+        return value.isoformat()
+    if isinstance(value, Decimal):
+        return float(value)
+    if isinstance(value, bytes):
+        return value.hex()
+    return str(value)
+
+
+def _estimate_rows(db, schema_name: str, table_name: str) -> Optional[int]:
+    # Planner statistics are free to read, an exact count(*) would scan the whole table
+    try:
+        estimate = db.execute(
+            text("SELECT reltuples::bigint FROM pg_class WHERE oid = to_regclass(:name)"),
+            {"name": f'"{schema_name}"."{table_name}"'}
+        ).scalar()
+    except Exception:
+        db.rollback()
+        return None
+    return estimate if estimate is not None and estimate > 0 else None
+
+
+def _remove_quietly(path: str):
+    # Another request may be collecting the same file at the same time
+    try:
+        os.remove(path)
+    except FileNotFoundError:
+        pass
+
+
+class ExportManager:
+    """Runs export jobs on a bounded worker pool and keeps track of their results on disk."""
+
+    def __init__(self, max_workers: int = EXPORT_WORKERS):
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix='export')
+        self._jobs: Dict[str, ExportJob] = {}
+        self._active: Dict[str, str] = {}
+        self._lock = threading.Lock()
+        self._cancelled = threading.Event()
+        self._gc_stop = threading.Event()
+        self._gc_thread: Optional[threading.Thread] = None
+
+    def start(self):
+        self._gc_thread = threading.Thread(target=self._gc_loop, name='export-gc', daemon=True)
+        self._gc_thread.start()
+
+    def shutdown(self):
+        # Running exports stop at their next batch, queued ones are dropped, so the process can exit promptly
+        self._cancelled.set()
+        self._gc_stop.set()
+        self._executor.shutdown(wait=False, cancel_futures=True)
+        with self._lock:
+            for job in self._jobs.values():
+                if job.status == QUEUED:
+                    self._finish(job, FAILED, "Export cancelled because the server is shutting down.")
+
+    def _gc_loop(self):
+        while not self._gc_stop.wait(EXPORT_GC_INTERVAL_SECONDS):
+            try:
+                self.collect_garbage()
+            except Exception:
+                # Keep the sweep alive, otherwise old results would never be collected again
+                logger.exception("Error collecting expired export results")
+
+    def submit(
+            self,
+            schema_name: str,
+            table_name: str,
+            filters: Dict[str, Any],
+            export_format: str,
+            user_id: int
+    ) -> ExportJob:
+        key = export_key(schema_name, table_name, filters, export_format)
+        with self._lock:
+            # Identical exports that are still queued or running share a single job
+            active_id = self._active.get(key)
+            if active_id is not None:
+                job = self._jobs[active_id]
+                job.owners.add(user_id)
+                return job
+            job = ExportJob(key, schema_name, table_name, filters, export_format, user_id)
+            self._jobs[job.job_id] = job
+            self._active[key] = job.job_id
+        self._executor.submit(self._run, job)
+        return job
+
+    def get(self, job_id: str, user_id: int) -> Optional[ExportJob]:
+        with self._lock:
+            job = self._jobs.get(job_id)
+            if job is None or user_id not in job.owners:
+                return None
+            self._expire_if_due(job, time.time() - EXPORT_RESULT_TTL_SECONDS)
+            return job
+
+    def list_jobs(self, user_id: int) -> List[ExportJob]:
+        with self._lock:
+            jobs = [job for job in self._jobs.values() if user_id in job.owners]
+        return sorted(jobs, key=lambda job: job.created_at, reverse=True)
+
+    def _finish(self, job: ExportJob, job_status: str, error: Optional[str] = None):
+        # Callers hold the lock, so readers never see a finished status without finished_at
+        job.status = job_status
+        job.error = error
+        job.finished_at = datetime.now(timezone.utc)
+        if self._active.get(job.key) == job.job_id:
+            del self._active[job.key]
+
+    def _check_cancelled(self):
+        if self._cancelled.is_set():
+            raise ExportCancelled("Export cancelled because the server is shutting down.")
+
+    def _run(self, job: ExportJob):
+        if self._cancelled.is_set():
+            return
+        job.status = RUNNING
+        job.started_at = datetime.now(timezone.utc)
+        partial_path = f"{job.path}.part"
+        db = SessionLocal()
+        try:
+            os.makedirs(EXPORT_DIR, exist_ok=True)
+            with timed_stage('export'):
+                table = reflect_table(job.table_name, job.schema_name)
+                query = select(table)
+                for column, value in job.filters.items():
+                    query = query.where(getattr(table.c, column) == value)
+                if not job.filters:
+                    job.total_rows_estimate = _estimate_rows(db, job.schema_name, job.table_name)
+
+                # yield_per streams the result through a server side cursor instead of loading it all in memory
+                result = db.execute(query.execution_options(yield_per=EXPORT_BATCH_SIZE))
+                columns = list(result.keys())
+                with gzip.open(partial_path, 'wt', compresslevel=EXPORT_COMPRESSLEVEL, encoding='utf8',
+                               newline='') as export_file:
+                    if job.format == 'csv':
+                        writer = csv.writer(export_file)
+                        writer.writerow(columns)
+                        for partition in result.partitions():
+                            self._check_cancelled()
+                            writer.writerows(partition)
+                            job.rows_written += len(partition)
+                    else:
+                        for partition in result.partitions():
+                            self._check_cancelled()
+                            export_file.writelines(
+                                json.dumps(dict(zip(columns, row)), default=_json_default) + '\n'
+                                for row in partition
+                            )
+                            job.rows_written += len(partition)
+            os.replace(partial_path, job.path)
+            job.size_bytes = os.path.getsize(job.path)
+            with self._lock:
+                self._finish(job, COMPLETED)
+        except ExportCancelled as e:
+            _remove_quietly(partial_path)
+            with self._lock:
+                self._finish(job, FAILED, str(e))
+        except Exception as e:
+            _remove_quietly(partial_path)
+            with self._lock:
+                self._finish(job, FAILED,
+                             f"Error exporting table '{job.table_name}' in schema '{job.schema_name}': {e}")
+        finally:
+            db.close()
+
+    def _expire_if_due(self, job: ExportJob, cutoff: float):
+        # Only completed jobs have a file to expire, failed ones keep their error until they are dropped
+        if job.status == COMPLETED and job.finished_at is not None and job.finished_at.timestamp() < cutoff:
+            job.status = EXPIRED
+            _remove_quietly(job.path)
+
+    def collect_garbage(self):
+        cutoff = time.time() - EXPORT_RESULT_TTL_SECONDS
+        with self._lock:
+            for job in list(self._jobs.values()):
+                self._expire_if_due(job, cutoff)
+                if job.status == FAILED and job.finished_at is not None and job.finished_at.timestamp() < cutoff:
+                    del self._jobs[job.job_id]
+                # Expired jobs are kept for another TTL so their ids answer with "expired" rather than "not found"
+                elif job.status == EXPIRED and job.finished_at.timestamp() < cutoff - EXPORT_RESULT_TTL_SECONDS:
+                    del self._jobs[job.job_id]
+            known_paths = {path for job in self._jobs.values() for path in (job.path, f"{job.path}.part")}
+        # Files left behind by a previous process are not tracked anymore, remove them once they expire
+        if os.path.isdir(EXPORT_DIR):
+            for name in os.listdir(EXPORT_DIR):
+                path = os.path.join(EXPORT_DIR, name)
+                try:
+                    if path not in known_paths and os.path.getmtime(path) < cutoff:
+                        _remove_quietly(path)
+                except FileNotFoundError:
+                    pass
+
+
+export_manager = ExportManager()
@@ -1,5 +1,9 @@
+from contextlib import asynccontextmanager
+
 from fastapi import FastAPI, APIRouter, Depends
-from app.endpoints import ground_data, auth, user_data
+from app.endpoints import ground_data, auth, user_data, metrics, admin, exports
+from app.exports import export_manager
+from app.metrics import MetricsMiddleware
 from app.utils import get_current_user
 
 description = """
@@ -8,7 +12,16 @@ Key functionalities include data retrieval, insertion, and schema management.
 The API ensures secure access with JWT-based authentication, and leverages Azure services for deployment, including automated CI/CD with GitHub Actions for consistent updates and reliability.
 """
 
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    export_manager.start()
+    yield
+    export_manager.shutdown()
+
+
 app = FastAPI(
+    lifespan=lifespan,
     title="GRND133",
     description=description,
     version="1.0",
@@ -23,6 +36,8 @@ app = FastAPI(
     },
 )
 
+app.add_middleware(MetricsMiddleware)
+
 root_router = APIRouter()
 
 
@@ -34,4 +49,7 @@ async def root():
 app.include_router(ground_data.router, prefix="/api/v1", tags=["ground_data"])
 app.include_router(user_data.router, prefix="/api/v1/user-data", tags=["user-data"])
 app.include_router(auth.router, prefix="/api/v1/auth", tags=["auth"])
+app.include_router(exports.router, prefix="/api/v1/exports", tags=["exports"])
+app.include_router(admin.router, prefix="/api/v1/admin", tags=["admin"])
+app.include_router(metrics.router, tags=["metrics"])
 app.include_router(root_router, tags=["root"])
@@ -0,0 +1,301 @@
+import asyncio
+import functools
+import os
+import threading
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+from dotenv import load_dotenv
+from fastapi.routing import APIRoute
+
+load_dotenv()
+
+METRICS_ENABLED = os.environ.get('METRICS_ENABLED', 'true').lower() in ('1', 'true', 'yes')
+METRICS_TOKEN = os.environ.get('METRICS_TOKEN')
+SERVER_TIMING_ENABLED = os.environ.get('SERVER_TIMING_ENABLED', 'false').lower() in ('1', 'true', 'yes')
+
+# Bucket boundaries in seconds, roughly 1ms to 10s
+LATENCY_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+SIZE_BUCKETS = (1, 10, 100, 1000, 10000, 100000, 1000000)
+
+
+class RequestContext:
+    """Per-request state shared between the middleware and the instrumented code paths."""
+    __slots__ = ('scope', 'table', 'stages', 'endpoint_finished')
+
+    def __init__(self, scope: Dict[str, Any]):
+        self.scope = scope
+        self.table: Optional[str] = None
+        self.stages: List[Tuple[str, float]] = []
+        self.endpoint_finished: Optional[float] = None
+
+    @property
+    def endpoint(self) -> str:
+        # Use the route template rather than the raw path to keep label cardinality bounded
+        route = self.scope.get('route')
+        return route.path if route is not None else 'unmatched'
+
+
+request_context: ContextVar[Optional[RequestContext]] = ContextVar('request_context', default=None)
+# Time spent in stages nested inside the currently open stage, so every stage records exclusive time
+_child_stage_time: ContextVar[Optional[List[float]]] = ContextVar('child_stage_time', default=None)
+
+
+class Histogram:
+    def __init__(self, name: str, documentation: str, label_names: Tuple[str, ...], buckets: Tuple[float, ...]):
+        self.name = name
+        self.documentation = documentation
+        self.label_names = label_names
+        self.buckets = buckets
+        self._values: Dict[Tuple[str, ...], List[Any]] = {}
+        self._lock = threading.Lock()
+
+    def observe(self, labels: Tuple[str, ...], value: float):
+        with self._lock:
+            entry = self._values.get(labels)
+            if entry is None:
+                # One counter per bucket, then sum and count
+                entry = self._values[labels] = [[0] * len(self.buckets), 0.0, 0]
+            counts = entry[0]
+            for i, bound in enumerate(self.buckets):
+                if value <= bound:
+                    counts[i] += 1
+                    break
+            entry[1] += value
+            entry[2] += 1
+
+    def render(self) -> List[str]:
+        lines = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} histogram"]
+        with self._lock:
+            items = [(labels, list(entry[0]), entry[1], entry[2]) for labels, entry in self._values.items()]
+        for labels, counts, total, count in items:
+            base = _format_labels(self.label_names, labels)
+            cumulative = 0
+            for bound, bucket_count in zip(self.buckets, counts):
+                cumulative += bucket_count
+                lines.append(f"{self.name}_bucket{_with_le(base, repr(float(bound)))} {cumulative}")
+            lines.append(f"{self.name}_bucket{_with_le(base, '+Inf')} {count}")
+            lines.append(f"{self.name}_sum{_braced(base)} {total}")
+            lines.append(f"{self.name}_count{_braced(base)} {count}")
+        return lines
+
+
+class Counter:
+    def __init__(self, name: str, documentation: str, label_names: Tuple[str, ...]):
+        self.name = name
+        self.documentation = documentation
+        self.label_names = label_names
+        self._values: Dict[Tuple[str, ...], float] = {}
+        self._lock = threading.Lock()
+
+    def inc(self, labels: Tuple[str, ...], amount: float = 1):
+        with self._lock:
+            self._values[labels] = self._values.get(labels, 0) + amount
+
+    def render(self) -> List[str]:
+        lines = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} counter"]
+        with self._lock:
+            items = list(self._values.items())
+        for labels, value in items:
+            lines.append(f"{self.name}{_braced(_format_labels(self.label_names, labels))} {value}")
+        return lines
+
+
+def _escape(value: str) -> str:
+    return value.replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+def _format_labels(label_names: Tuple[str, ...], labels: Tuple[str, ...]) -> str:
+    return ','.join(f'{name}="{_escape(str(value))}"' for name, value in zip(label_names, labels))
+
+
+def _braced(base: str) -> str:
+    return f"{{{base}}}" if base else ""
+
+
+def _with_le(base: str, le: str) -> str:
+    return f'{{{base},le="{le}"}}' if base else f'{{le="{le}"}}'
+
+
+REQUEST_DURATION = Histogram('api_request_duration_seconds', 'Total request handling time.',
+                             ('method', 'endpoint', 'status'), LATENCY_BUCKETS)
+STAGE_DURATION = Histogram('api_stage_duration_seconds', 'Time spent in each stage of request handling.',
+                           ('endpoint', 'stage'), LATENCY_BUCKETS)
+TABLE_ROWS = Histogram('api_table_rows_returned', 'Rows returned per table data request.',
+                       ('table',), SIZE_BUCKETS)
+TABLE_ROWS_TOTAL = Counter('api_table_rows_returned_total', 'Total rows returned per table.', ('table',))
+TABLE_BYTES_TOTAL = Counter('api_table_response_bytes_total', 'Total response body bytes sent per table.',
+                            ('table',))
+CACHE_LOOKUPS = Counter('api_cache_lookups_total', 'Cache lookups by cache and result.', ('cache', 'result'))
+
+REGISTRY = [REQUEST_DURATION, STAGE_DURATION, TABLE_ROWS, TABLE_ROWS_TOTAL, TABLE_BYTES_TOTAL, CACHE_LOOKUPS]
+
+
+def record_stage(stage: str, duration: float):
+    ctx = request_context.get()
+    if ctx is None:
+        STAGE_DURATION.observe(('background', stage), duration)
+        return
+    # Observed by the middleware once the route template is known
+    ctx.stages.append((stage, duration))
+
+
+@contextmanager
+def timed_stage(stage: str):
+    # Stages may nest (e.g. reflection inside schema validation). Each one records only its own time and
+    # hands its total to the enclosing stage, so the stages of a request never overlap and can be summed
+    if not METRICS_ENABLED:
+        yield
+        return
+    parent = _child_stage_time.get()
+    children = [0.0]
+    token = _child_stage_time.set(children)
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        elapsed = time.perf_counter() - start
+        _child_stage_time.reset(token)
+        if parent is not None:
+            parent[0] += elapsed
+        record_stage(stage, elapsed - children[0])
+
+
+def _mark_endpoint_finished():
+    ctx = request_context.get()
+    if ctx is not None:
+        ctx.endpoint_finished = time.perf_counter()
+
+
+def _timed_endpoint(call: Callable) -> Callable:
+    # FastAPI decides between awaiting and the threadpool by inspecting the call, so keep its kind
+    if asyncio.iscoroutinefunction(call):
+        @functools.wraps(call)
+        async def async_endpoint(*args, **kwargs):
+            try:
+                return await call(*args, **kwargs)
+            finally:
+                _mark_endpoint_finished()
+        return async_endpoint
+
+    @functools.wraps(call)
+    def endpoint(*args, **kwargs):
+        try:
+            return call(*args, **kwargs)
+        finally:
+            _mark_endpoint_finished()
+    return endpoint
+
+
+class TimedRoute(APIRoute):
+    """Route class that records the time FastAPI spends validating and rendering the endpoint's return value."""
+
+    def get_route_handler(self) -> Callable:
+        if METRICS_ENABLED and not getattr(self.dependant.call, '__timed_endpoint__', False):
+            self.dependant.call = _timed_endpoint(self.dependant.call)
+            self.dependant.call.__timed_endpoint__ = True
+        handler = super().get_route_handler()
+        if not METRICS_ENABLED:
+            return handler
+
+        async def timed_handler(request):
+            response = await handler(request)
+            ctx = request_context.get()
+            if ctx is not None and ctx.endpoint_finished is not None:
+                record_stage('response_validation', time.perf_counter() - ctx.endpoint_finished)
+            return response
+
+        return timed_handler
+
+
+def table_label(schema_name: str, table_name: str) -> str:
+    # Private tables are named by their users, so fold all of them into one label. This keeps the
+    # label set bounded and keeps private table names off the metrics endpoint
+    if schema_name.startswith('user_own_data_'):
+        return 'user_own_data'
+    return f"{schema_name}.{table_name}"
+
+
+def record_table_rows(schema_name: str, table_name: str, rows: int):
+    if not METRICS_ENABLED:
+        return
+    table = table_label(schema_name, table_name)
+    ctx = request_context.get()
+    if ctx is not None:
+        ctx.table = table
+    TABLE_ROWS.observe((table,), rows)
+    TABLE_ROWS_TOTAL.inc((table,), rows)
+
+
+def record_cache_lookup(cache: str, hit: bool):
+    if not METRICS_ENABLED:
+        return
+    CACHE_LOOKUPS.inc((cache, 'hit' if hit else 'miss'))
+
+
+def render_metrics() -> str:
+    lines = []
+    for metric in REGISTRY:
+        lines.extend(metric.render())
+    return '\n'.join(lines) + '\n'
+
+
+def _server_timing(stages: List[Tuple[str, float]], total: float) -> str:
+    # Stages can repeat within a request (e.g. several reflections), so sum them per name
+    summed: Dict[str, float] = {}
+    for stage, duration in stages:
+        summed[stage] = summed.get(stage, 0.0) + duration
+    entries = [f"{stage};dur={duration * 1000:.2f}" for stage, duration in summed.items()]
+    entries.append(f"total;dur={total * 1000:.2f}")
+    return ', '.join(entries)
+
+
+class MetricsMiddleware:
+    """Pure ASGI middleware that sets up the request context and records request level metrics."""
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope['type'] != 'http':
+            await self.app(scope, receive, send)
+            return
+
+        ctx = RequestContext(scope)
+        token = request_context.set(ctx)
+        if not METRICS_ENABLED:
+            try:
+                await self.app(scope, receive, send)
+            finally:
+                request_context.reset(token)
+            return
+
+        start = time.perf_counter()
+        status_code = 500
+        body_bytes = 0
+
+        async def send_wrapper(message):
+            nonlocal status_code, body_bytes
+            if message['type'] == 'http.response.start':
+                status_code = message['status']
+                if SERVER_TIMING_ENABLED:
+                    header = _server_timing(ctx.stages, time.perf_counter() - start)
+                    message['headers'] = list(message.get('headers', [])) + [
+                        (b'server-timing', header.encode('latin-1'))
+                    ]
+            elif message['type'] == 'http.response.body':
+                body_bytes += len(message.get('body', b''))
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            endpoint = ctx.endpoint
+            REQUEST_DURATION.observe((scope['method'], endpoint, str(status_code)), time.perf_counter() - start)
+            for stage, duration in ctx.stages:
+                STAGE_DURATION.observe((endpoint, stage), duration)
+            if ctx.table is not None:
+                TABLE_BYTES_TOTAL.inc((ctx.table,), body_bytes)
+            request_context.reset(token)
@@ -1,4 +1,4 @@
-from typing import Any, Dict
+from typing import Any, Dict, Literal
 
 from pydantic import BaseModel
 
@@ -12,3 +12,10 @@ class TableCreateRequest(BaseModel):
 class RowUpdateRequest(BaseModel):
     row_id: Any
     update_data: Dict[str, Any]
+
+
+class ExportRequest(BaseModel):
+    schema_name: str
+    table_name: str
+    filters: Dict[str, Any] = {}
+    format: Literal['csv', 'ndjson'] = 'csv'
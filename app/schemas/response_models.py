@@ -1,4 +1,5 @@
-from typing import List, Dict, Any
+from datetime import datetime
+from typing import List, Dict, Any, Optional
 from pydantic import BaseModel
 
 
@@ -32,3 +33,44 @@ class TableStructureResponse(BaseModel):
     table_name: str
     columns: Dict[str, str]
     primary_key: str = None
+
+
+class SlowQueryEntry(BaseModel):
+    fingerprint: str
+    statement: str
+    count: int
+    total_ms: float
+    mean_ms: float
+    max_ms: float
+    first_seen: float
+    last_seen: float
+    parameter_shape: Any = None
+    endpoints: Dict[str, int]
+    explain_plan: Any = None
+    explain_captured_at: Optional[float] = None
+
+
+class SlowQueryResponse(BaseModel):
+    threshold_ms: float
+    queries: List[SlowQueryEntry]
+
+
+class ExportJobResponse(BaseModel):
+    job_id: str
+    status: str
+    schema_name: str
+    table_name: str
+    filters: Dict[str, Any]
+    format: str
+    rows_written: int
+    total_rows_estimate: Optional[int] = None
+    progress: Optional[float] = None
+    size_bytes: Optional[int] = None
+    error: Optional[str] = None
+    created_at: datetime
+    started_at: Optional[datetime] = None
+    finished_at: Optional[datetime] = None
+
+
+class ExportJobsResponse(BaseModel):
+    jobs: List[ExportJobResponse]
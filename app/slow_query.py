@@ -0,0 +1,199 @@
+import hashlib
+import logging
+import os
+import random
+import re
+import threading
+import time
+from typing import Any, Dict, List
+
+from dotenv import load_dotenv
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+
+from app.metrics import request_context
+
+load_dotenv()
+
+logger = logging.getLogger(__name__)
+
+SLOW_QUERY_LOG_ENABLED = os.environ.get('SLOW_QUERY_LOG_ENABLED', 'true').lower() in ('1', 'true', 'yes')
+SLOW_QUERY_THRESHOLD_MS = float(os.environ.get('SLOW_QUERY_THRESHOLD_MS', '500'))
+SLOW_QUERY_EXPLAIN_SAMPLE_RATE = float(os.environ.get('SLOW_QUERY_EXPLAIN_SAMPLE_RATE', '0.05'))
+SLOW_QUERY_MAX_FINGERPRINTS = int(os.environ.get('SLOW_QUERY_MAX_FINGERPRINTS', '500'))
+
+_STRING_LITERAL = re.compile(r"'(?:[^']|'')*'")
+_BIND_PARAM = re.compile(r"%\(\w+\)s|%s|(?<!:):\w+|\$\d+|\?")
+_NUMBER = re.compile(r"(?<![\w.\"])-?\d+(?:\.\d+)?\b")
+_IN_LIST = re.compile(r"\(\s*\?(?:\s*,\s*\?)+\s*\)")
+_USER_SCHEMA = re.compile(r"user_own_data_\d+")
+_WHITESPACE = re.compile(r"\s+")
+# Statements that must not run a second time under EXPLAIN ANALYZE: row locks and functions with side effects
+_NOT_REPEATABLE = re.compile(
+    r"\bFOR\s+(?:NO\s+KEY\s+)?UPDATE\b|\bFOR\s+(?:KEY\s+)?SHARE\b"
+    r"|\b(?:nextval|setval|pg_advisory\w*|pg_try_advisory\w*|pg_notify|lo_\w+)\s*\(",
+    re.IGNORECASE
+)
+
+
+def normalize_statement(statement: str) -> str:
+    normalized = _STRING_LITERAL.sub('?', statement)
+    normalized = _BIND_PARAM.sub('?', normalized)
+    normalized = _NUMBER.sub('?', normalized)
+    normalized = _IN_LIST.sub('(?...)', normalized)
+    # Every user has a private schema, fold them so the same statement shares a fingerprint
+    normalized = _USER_SCHEMA.sub('user_own_data_?', normalized)
+    return _WHITESPACE.sub(' ', normalized).strip()
+
+
+def fingerprint_statement(normalized: str) -> str:
+    return hashlib.sha1(normalized.encode('utf-8')).hexdigest()[:16]
+
+
+def parameter_shape(parameters: Any, executemany: bool) -> Any:
+    # Record only the names and types of the parameters, never their values
+    if executemany and isinstance(parameters, (list, tuple)):
+        return {"rows": len(parameters), "row": parameter_shape(parameters[0], False) if parameters else None}
+    if isinstance(parameters, dict):
+        return {key: type(value).__name__ for key, value in parameters.items()}
+    if isinstance(parameters, (list, tuple)):
+        return [type(value).__name__ for value in parameters]
+    return None
+
+
+class SlowQueryLog:
+    """Aggregates slow statements by fingerprint, keeping at most `max_fingerprints` entries."""
+
+    def __init__(self, max_fingerprints: int = SLOW_QUERY_MAX_FINGERPRINTS):
+        self.max_fingerprints = max_fingerprints
+        self._entries: Dict[str, Dict[str, Any]] = {}
+        self._lock = threading.Lock()
+
+    def record(
+            self,
+            statement: str,
+            shape: Any,
+            duration_ms: float,
+            endpoint: str,
+            explain_plan: Any = None
+    ) -> str:
+        normalized = normalize_statement(statement)
+        fingerprint = fingerprint_statement(normalized)
+        now = time.time()
+        with self._lock:
+            entry = self._entries.get(fingerprint)
+            if entry is None:
+                if len(self._entries) >= self.max_fingerprints:
+                    # Make room by dropping the fingerprint with the least accumulated time
+                    cheapest = min(self._entries, key=lambda key: self._entries[key]['total_ms'])
+                    del self._entries[cheapest]
+                entry = self._entries[fingerprint] = {
+                    'fingerprint': fingerprint,
+                    'statement': normalized,
+                    'count': 0,
+                    'total_ms': 0.0,
+                    'max_ms': 0.0,
+                    'first_seen': now,
+                    'last_seen': now,
+                    'parameter_shape': shape,
+                    'endpoints': {},
+                    'explain_plan': None,
+                    'explain_captured_at': None,
+                }
+            entry['count'] += 1
+            entry['total_ms'] += duration_ms
+            entry['max_ms'] = max(entry['max_ms'], duration_ms)
+            entry['last_seen'] = now
+            entry['parameter_shape'] = shape
+            entry['endpoints'][endpoint] = entry['endpoints'].get(endpoint, 0) + 1
+            if explain_plan is not None:
+                entry['explain_plan'] = explain_plan
+                entry['explain_captured_at'] = now
+        return fingerprint
+
+    def top(self, limit: int = 20, order_by: str = 'total_ms') -> List[Dict[str, Any]]:
+        with self._lock:
+            entries = [dict(entry, endpoints=dict(entry['endpoints'])) for entry in self._entries.values()]
+        for entry in entries:
+            entry['mean_ms'] = entry['total_ms'] / entry['count']
+        entries.sort(key=lambda entry: entry[order_by], reverse=True)
+        return entries[:limit]
+
+    def reset(self):
+        with self._lock:
+            self._entries.clear()
+
+
+slow_query_log = SlowQueryLog()
+
+
+def _should_explain(conn, statement: str, executemany: bool) -> bool:
+    if executemany or conn.dialect.name != 'postgresql':
+        return False
+    if not statement.lstrip().upper().startswith('SELECT'):
+        return False
+    return random.random() < SLOW_QUERY_EXPLAIN_SAMPLE_RATE
+
+
+def _explain_options(statement: str) -> str:
+    # EXPLAIN ANALYZE executes the statement again, locking reads and side effects only get the estimated plan
+    if _NOT_REPEATABLE.search(statement):
+        return "FORMAT JSON"
+    return "ANALYZE, BUFFERS, FORMAT JSON"
+
+
+def _explain(cursor, statement: str, parameters: Any) -> Any:
+    # Run on a separate cursor of the same connection inside a savepoint, so a failing
+    # EXPLAIN cannot abort the caller's transaction
+    explain_cursor = cursor.connection.cursor()
+    try:
+        explain_cursor.execute("SAVEPOINT slow_query_explain")
+        try:
+            explain_cursor.execute(f"EXPLAIN ({_explain_options(statement)}) {statement}", parameters)
+            plan = explain_cursor.fetchone()[0]
+            explain_cursor.execute("RELEASE SAVEPOINT slow_query_explain")
+            return plan
+        except Exception as e:
+            explain_cursor.execute("ROLLBACK TO SAVEPOINT slow_query_explain")
+            return {"error": str(e)}
+    except Exception as e:
+        return {"error": str(e)}
+    finally:
+        explain_cursor.close()
+
+
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    conn.info.setdefault('slow_query_start', []).append(time.perf_counter())
+
+
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    start_times = conn.info.get('slow_query_start')
+    if not start_times:
+        return
+    duration_ms = (time.perf_counter() - start_times.pop()) * 1000
+    if duration_ms < SLOW_QUERY_THRESHOLD_MS:
+        return
+
+    ctx = request_context.get()
+    endpoint = ctx.endpoint if ctx is not None else 'background'
+    explain_plan = None
+    if _should_explain(conn, statement, executemany):
+        explain_plan = _explain(cursor, statement, parameters)
+    fingerprint = slow_query_log.record(statement, parameter_shape(parameters, executemany), duration_ms, endpoint,
+                                        explain_plan)
+    logger.warning("Slow query %s (%.1f ms) from %s", fingerprint, duration_ms, endpoint)
+
+
+def _handle_error(exception_context):
+    # after_cursor_execute is not called for failing statements, drop their start time here
+    conn = exception_context.connection
+    if conn is not None and conn.info.get('slow_query_start'):
+        conn.info['slow_query_start'].pop()
+
+
+def register_slow_query_log(engine: Engine):
+    if not SLOW_QUERY_LOG_ENABLED:
+        return
+    event.listen(engine, 'before_cursor_execute', _before_cursor_execute)
+    event.listen(engine, 'after_cursor_execute', _after_cursor_execute)
+    event.listen(engine, 'handle_error', _handle_error)
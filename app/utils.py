@@ -1,10 +1,11 @@
 from datetime import datetime
 from fastapi import Depends, HTTPException, status
 from fastapi.security import OAuth2PasswordBearer
-from sqlalchemy import Table, select
+from sqlalchemy import select
 from sqlalchemy.orm import Session
 
-from app.db import get_db, metadata, engine
+from app.db import get_db, reflect_table
+from app.metrics import timed_stage
 from app.security import ALGORITHM, JWT_SECRET_KEY
 
 from jose import jwt
@@ -32,9 +33,10 @@ async def get_current_user(token: str = Depends(reuseable_oauth), db: Session =
             headers={"WWW-Authenticate": "Bearer"},
         )
 
-    table = Table('user', metadata, autoload_with=engine, schema='account')
+    table = reflect_table('user', 'account')
     user_query = select(table).where(table.c.email == token_data.sub)
-    user = db.execute(user_query).fetchone()
+    with timed_stage('auth'):
+        user = db.execute(user_query).fetchone()
 
     if user is None:
         raise HTTPException(
@@ -51,3 +53,12 @@ async def get_current_user(token: str = Depends(reuseable_oauth), db: Session =
         phone_number=user.phone_number,
         password=user.password
     )
+
+
+async def get_admin_user(current_user: SystemUser = Depends(get_current_user)) -> SystemUser:
+    if current_user.privilege != "Admin":
+        raise HTTPException(
+            status_code=status.HTTP_403_FORBIDDEN,
+            detail="Admin privilege required",
+        )
+    return current_user
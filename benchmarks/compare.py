@@ -0,0 +1,45 @@
+"""Compare two benchmark reports produced by run.py.
+
+Usage: python benchmarks/compare.py baseline.json candidate.json
+"""
+import json
+import sys
+from typing import Any, Dict, Optional, Tuple
+
+
+def load(path: str) -> Tuple[Dict[str, Any], Dict[str, Any], Dict[Tuple[str, int], Dict[str, Any]]]:
+    with open(path, encoding="utf8") as report_file:
+        report = json.load(report_file)
+    results = {(result["endpoint"], result["concurrency"]): result for result in report["results"]}
+    return report["meta"], report["server"], results
+
+
+def change(before: Optional[float], after: Optional[float]) -> str:
+    if not before or after is None:
+        return "n/a"
+    return f"{(after - before) / before * 100:+.1f}%"
+
+
+def main():
+    if len(sys.argv) != 3:
+        sys.exit(__doc__.strip().splitlines()[-1])
+    base_meta, base_server, base = load(sys.argv[1])
+    cand_meta, cand_server, cand = load(sys.argv[2])
+    if base_meta["parameters"] != cand_meta["parameters"]:
+        print("warning: the reports were produced with different parameters", file=sys.stderr)
+
+    print(f"baseline  {base_meta['commit']}\ncandidate {cand_meta['commit']}")
+    print(f"server peak rss {change(base_server['peak_rss_bytes'], cand_server['peak_rss_bytes'])}\n")
+    print(f"{'endpoint':>24} {'c':>3} {'req/s':>10} {'p50':>10} {'p95':>10} {'p99':>10} {'peak rss':>10}")
+    for key in sorted(base.keys() & cand.keys()):
+        before, after = base[key], cand[key]
+        print(f"{key[0]:>24} {key[1]:>3} "
+              f"{change(before['throughput_rps'], after['throughput_rps']):>10} "
+              f"{change(before['p50_ms'], after['p50_ms']):>10} "
+              f"{change(before['p95_ms'], after['p95_ms']):>10} "
+              f"{change(before['p99_ms'], after['p99_ms']):>10} "
+              f"{change(before['peak_rss_bytes'], after['peak_rss_bytes']):>10}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,287 @@
+"""Endpoint benchmark for the API.
+
+Seeds a local Postgres stand-in with synthetic data, starts the app with uvicorn and drives every router at
+fixed concurrency levels. Results are written as JSON, see README.md for usage.
+"""
+import argparse
+import asyncio
+import json
+import math
+import os
+import platform
+import socket
+import subprocess
+import sys
+import time
+from datetime import datetime, timezone
+from typing import Any, Dict, List, Optional
+
+import httpx
+from sqlalchemy import create_engine
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from benchmarks.seed import seed, load_layout, ensure_database, BENCH_EMAIL, BENCH_PASSWORD, \
+    DATABASE_NAME  # noqa: E402
+
+
+def parse_args() -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--db-host", default=os.environ.get("BENCH_DB_HOST", "localhost:5432"),
+                        help="host:port of the local Postgres stand-in, never point this at a shared database")
+    parser.add_argument("--db-user", default=os.environ.get("BENCH_DB_USER", "postgres"))
+    parser.add_argument("--db-password", default=os.environ.get("BENCH_DB_PASSWORD", "postgres"))
+    parser.add_argument("--ground-tables", type=int, default=2)
+    parser.add_argument("--ground-rows", type=int, default=10000)
+    parser.add_argument("--user-tables", type=int, default=2)
+    parser.add_argument("--user-rows", type=int, default=1000)
+    parser.add_argument("--seed", type=int, default=133, help="random seed for the synthetic data")
+    parser.add_argument("--skip-seed", action="store_true", help="reuse the data from a previous run")
+    parser.add_argument("--concurrency", default="1,8,32", help="comma separated concurrency levels")
+    parser.add_argument("--requests", type=int, default=200, help="measured requests per endpoint and level")
+    parser.add_argument("--warmup", type=int, default=20, help="unmeasured requests per endpoint and level")
+    parser.add_argument("--port", type=int, default=8133)
+    parser.add_argument("--endpoints", default=None, help="comma separated endpoint names to run, default all")
+    parser.add_argument("--output", default=None, help="write the JSON report here instead of stdout")
+    args = parser.parse_args()
+    if args.requests < 1:
+        parser.error("--requests must be at least 1")
+    if args.warmup < 0:
+        parser.error("--warmup must not be negative")
+    return args
+
+
+def git_revision() -> Dict[str, Any]:
+    try:
+        commit = subprocess.check_output(["git", "rev-parse", "HEAD"], cwd=ROOT, text=True).strip()
+        dirty = bool(subprocess.check_output(["git", "status", "--porcelain", "--untracked-files=no"],
+                                             cwd=ROOT, text=True).strip())
+        return {"commit": commit, "dirty": dirty}
+    except (OSError, subprocess.CalledProcessError):
+        return {"commit": None, "dirty": None}
+
+
+def read_rss(pid: int) -> Dict[str, Optional[int]]:
+    # VmHWM is the peak resident set size over the lifetime of the process
+    values = {"rss_bytes": None, "peak_rss_bytes": None}
+    try:
+        with open(f"/proc/{pid}/status") as status:
+            for line in status:
+                if line.startswith("VmRSS:"):
+                    values["rss_bytes"] = int(line.split()[1]) * 1024
+                elif line.startswith("VmHWM:"):
+                    values["peak_rss_bytes"] = int(line.split()[1]) * 1024
+    except OSError:
+        pass
+    return values
+
+
+def reset_peak_rss(pid: int) -> bool:
+    # Writing 5 to clear_refs resets VmHWM to the current RSS, so each endpoint gets its own peak
+    try:
+        with open(f"/proc/{pid}/clear_refs", "w") as clear_refs:
+            clear_refs.write("5")
+        return True
+    except OSError:
+        return False
+
+
+def build_endpoints(layout: Dict[str, Any]) -> List[Dict[str, Any]]:
+    ground_schema = layout["ground_schema"]
+    ground_table = layout["ground_tables"][0]
+    user_table = layout["user_tables"][0]
+    return [
+        {"name": "schemas", "method": "GET", "path": "/api/v1/schemas"},
+        {"name": "schema_tables", "method": "GET", "path": f"/api/v1/schemas/{ground_schema}/tables"},
+        {"name": "ground_data_limit_100", "method": "GET",
+         "path": f"/api/v1/schemas/{ground_schema}/tables/{ground_table}/data", "params": {"limit": 100}},
+        {"name": "ground_data_full", "method": "GET",
+         "path": f"/api/v1/schemas/{ground_schema}/tables/{ground_table}/data"},
+        {"name": "ground_data_by_key", "method": "GET",
+         "path": f"/api/v1/schemas/{ground_schema}/tables/{ground_table}/data", "params": {"primary_key_value": 1}},
+        {"name": "user_tables", "method": "GET", "path": "/api/v1/user-data/tables", "auth": True},
+        {"name": "user_data", "method": "GET", "path": f"/api/v1/user-data/tables/{user_table}", "auth": True},
+        {"name": "user_table_structure", "method": "GET",
+         "path": f"/api/v1/user-data/table_structure/{user_table}", "auth": True},
+        {"name": "user_update_row", "method": "PATCH", "path": f"/api/v1/user-data/tables/{user_table}/rows",
+         "json": {"row_id": 1, "update_data": {"verified": True}}, "auth": True},
+        {"name": "auth_login", "method": "POST", "path": "/api/v1/auth/login",
+         "data": {"username": BENCH_EMAIL, "password": BENCH_PASSWORD}},
+        {"name": "auth_me", "method": "GET", "path": "/api/v1/auth/me", "auth": True},
+        {"name": "admin_slow_queries", "method": "GET", "path": "/api/v1/admin/slow-queries", "auth": True},
+        {"name": "metrics", "method": "GET", "path": "/metrics"},
+    ]
+
+
+def percentile(sorted_values: List[float], fraction: float) -> Optional[float]:
+    # Nearest-rank percentile, good enough for a few hundred samples and stable across runs
+    if not sorted_values:
+        return None
+    index = max(0, math.ceil(fraction * len(sorted_values)) - 1)
+    return sorted_values[index]
+
+
+async def drive(client: httpx.AsyncClient, endpoint: Dict[str, Any], token: str, total: int,
+                concurrency: int) -> Dict[str, Any]:
+    headers = {"Authorization": f"Bearer {token}"} if endpoint.get("auth") else {}
+    latencies: List[float] = []
+    errors = 0
+    response_bytes = 0
+    remaining = total
+
+    async def worker():
+        nonlocal remaining, errors, response_bytes
+        while remaining > 0:
+            remaining -= 1
+            start = time.perf_counter()
+            try:
+                response = await client.request(
+                    endpoint["method"],
+                    endpoint["path"],
+                    params=endpoint.get("params"),
+                    json=endpoint.get("json"),
+                    data=endpoint.get("data"),
+                    headers=headers,
+                )
+            except httpx.HTTPError:
+                # Timeouts and dropped connections under load count as errors instead of aborting the run
+                errors += 1
+                continue
+            latencies.append(time.perf_counter() - start)
+            response_bytes += len(response.content)
+            if response.status_code >= 400:
+                errors += 1
+
+    started = time.perf_counter()
+    await asyncio.gather(*(worker() for _ in range(concurrency)))
+    elapsed = time.perf_counter() - started
+
+    latencies.sort()
+    latencies_ms = [latency * 1000 for latency in latencies]
+    return {
+        "requests": total,
+        "responses": len(latencies),
+        "errors": errors,
+        "elapsed_s": elapsed,
+        "throughput_rps": len(latencies) / elapsed if elapsed else None,
+        "p50_ms": percentile(latencies_ms, 0.50),
+        "p95_ms": percentile(latencies_ms, 0.95),
+        "p99_ms": percentile(latencies_ms, 0.99),
+        "mean_response_bytes": response_bytes / len(latencies) if latencies else None,
+    }
+
+
+async def run_benchmark(args: argparse.Namespace, endpoints: List[Dict[str, Any]], pid: int) -> List[Dict[str, Any]]:
+    levels = [int(level) for level in args.concurrency.split(",")]
+    base_url = f"http://127.0.0.1:{args.port}"
+    limits = httpx.Limits(max_connections=max(levels), max_keepalive_connections=max(levels))
+    results = []
+    async with httpx.AsyncClient(base_url=base_url, limits=limits, timeout=120) as client:
+        login = await client.post("/api/v1/auth/login", data={"username": BENCH_EMAIL, "password": BENCH_PASSWORD})
+        login.raise_for_status()
+        token = login.json()["access_token"]
+
+        for concurrency in levels:
+            for endpoint in endpoints:
+                if args.warmup:
+                    await drive(client, endpoint, token, args.warmup, concurrency)
+                peak_reset = reset_peak_rss(pid)
+                result = await drive(client, endpoint, token, args.requests, concurrency)
+                result.update({"endpoint": endpoint["name"], "method": endpoint["method"],
+                               "path": endpoint["path"], "concurrency": concurrency})
+                result.update(read_rss(pid))
+                if not peak_reset:
+                    # Without a reset the peak belongs to whichever earlier endpoint used the most memory
+                    result["peak_rss_bytes"] = None
+                results.append(result)
+                p50 = f"{result['p50_ms']:.1f}ms" if result["p50_ms"] is not None else "n/a"
+                p99 = f"{result['p99_ms']:.1f}ms" if result["p99_ms"] is not None else "n/a"
+                print(f"{endpoint['name']:>24} c={concurrency:<3} {result['throughput_rps']:8.1f} req/s "
+                      f"p50={p50} p99={p99} errors={result['errors']}", file=sys.stderr)
+    return results
+
+
+def wait_until_ready(port: int, process: subprocess.Popen, timeout: float = 30):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        if process.poll() is not None:
+            raise RuntimeError(f"API exited with code {process.returncode} during startup")
+        try:
+            with socket.create_connection(("127.0.0.1", port), timeout=0.5):
+                pass
+            if httpx.get(f"http://127.0.0.1:{port}/", timeout=2).status_code == 200:
+                return
+        except (OSError, httpx.HTTPError):
+            time.sleep(0.2)
+    raise RuntimeError("API did not become ready in time")
+
+
+def main():
+    args = parse_args()
+
+    ensure_database(args.db_host, args.db_user, args.db_password)
+    engine = create_engine(f"postgresql://{args.db_user}:{args.db_password}@{args.db_host}/{DATABASE_NAME}")
+    if args.skip_seed:
+        layout = load_layout(engine)
+    else:
+        print("Seeding benchmark data...", file=sys.stderr)
+        layout = seed(engine, args.ground_tables, args.ground_rows, args.user_tables, args.user_rows, args.seed)
+    engine.dispose()
+
+    endpoints = build_endpoints(layout)
+    if args.endpoints:
+        selected = set(args.endpoints.split(","))
+        endpoints = [endpoint for endpoint in endpoints if endpoint["name"] in selected]
+
+    env = dict(os.environ, DB_URL=args.db_host, DB_USER=args.db_user, DB_PASSWORD=args.db_password,
+               JWT_SECRET_KEY=os.environ.get("JWT_SECRET_KEY", "benchmark-secret"))
+    process = subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", "app.main:app", "--host=127.0.0.1", f"--port={args.port}",
+         "--log-level=warning"],
+        cwd=ROOT,
+        env=env,
+    )
+    try:
+        wait_until_ready(args.port, process)
+        results = asyncio.run(run_benchmark(args, endpoints, process.pid))
+        server = read_rss(process.pid)
+        # VmHWM is reset before every endpoint, so the overall peak is the highest of the per endpoint peaks
+        peaks = [result["peak_rss_bytes"] for result in results if result["peak_rss_bytes"] is not None]
+        if peaks:
+            server["peak_rss_bytes"] = max(peaks + [server["peak_rss_bytes"] or 0])
+    finally:
+        process.terminate()
+        process.wait(timeout=10)
+
+    report = {
+        "meta": {
+            **git_revision(),
+            "timestamp": datetime.now(timezone.utc).isoformat(),
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "cpu_count": os.cpu_count(),
+            "parameters": {
+                "ground_tables": args.ground_tables,
+                "ground_rows": args.ground_rows,
+                "user_tables": args.user_tables,
+                "user_rows": args.user_rows,
+                "seed": args.seed,
+                "concurrency": args.concurrency,
+                "requests": args.requests,
+                "warmup": args.warmup,
+            },
+        },
+        "server": server,
+        "results": results,
+    }
+    output = json.dumps(report, indent=2)
+    if args.output:
+        with open(args.output, "w", encoding="utf8") as report_file:
+            report_file.write(output + "\n")
+    else:
+        print(output)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,153 @@
+import random
+from datetime import date, timedelta
+from typing import Any, Dict, List
+
+from sqlalchemy import MetaData, Table, Column, Integer, String, Float, Date, Boolean, DDL, create_engine, \
+    inspect, select, text
+from sqlalchemy.engine import Engine
+
+from app.security import get_hashed_password
+
+GROUND_SCHEMA = "bench_ground"
+BENCH_EMAIL = "bench@saxion.nl"
+BENCH_PASSWORD = "bench-password"
+DATABASE_NAME = "db-3s"
+
+
+def ensure_database(host: str, user: str, password: str):
+    # The API always connects to the `db-3s` database, create it on the stand-in server if needed
+    server = create_engine(f"postgresql://{user}:{password}@{host}/postgres", isolation_level="AUTOCOMMIT")
+    try:
+        with server.connect() as conn:
+            exists = conn.execute(text("SELECT 1 FROM pg_database WHERE datname = :name"),
+                                  {"name": DATABASE_NAME}).scalar()
+            if not exists:
+                conn.execute(text(f'CREATE DATABASE "{DATABASE_NAME}"'))
+    finally:
+        server.dispose()
+
+
+def _measurement_table(metadata: MetaData, name: str, schema: str) -> Table:
+    return Table(
+        name,
+        metadata,
+        Column("id", Integer, primary_key=True),
+        Column("station", String(64)),
+        Column("measured_on", Date),
+        Column("value", Float),
+        Column("depth", Float),
+        Column("verified", Boolean),
+        schema=schema,
+    )
+
+
+def _measurement_rows(rng: random.Random, count: int) -> List[Dict[str, Any]]:
+    start = date(2020, 1, 1)
+    return [
+        {
+            "id": i,
+            "station": f"station_{rng.randrange(200):03d}",
+            "measured_on": start + timedelta(days=rng.randrange(1500)),
+            "value": round(rng.uniform(-50, 50), 4),
+            "depth": round(rng.uniform(0, 30), 2),
+            "verified": rng.random() < 0.8,
+        }
+        for i in range(1, count + 1)
+    ]
+
+
+def _insert_rows(engine: Engine, table: Table, rng: random.Random, count: int, batch_size: int = 5000):
+    rows = _measurement_rows(rng, count)
+    with engine.begin() as conn:
+        for offset in range(0, len(rows), batch_size):
+            conn.execute(table.insert(), rows[offset:offset + batch_size])
+
+
+def seed(
+        engine: Engine,
+        ground_tables: int,
+        ground_rows: int,
+        user_tables: int,
+        user_rows: int,
+        seed_value: int
+) -> Dict[str, Any]:
+    """Recreate the benchmark schemas with deterministic synthetic data and return what was created."""
+    rng = random.Random(seed_value)
+    metadata = MetaData()
+
+    with engine.begin() as conn:
+        conn.execute(DDL("CREATE SCHEMA IF NOT EXISTS account"))
+        conn.execute(DDL(f"DROP SCHEMA IF EXISTS {GROUND_SCHEMA} CASCADE"))
+        conn.execute(DDL(f"CREATE SCHEMA {GROUND_SCHEMA}"))
+
+    dictionary = Table("ground_data_schema_dictionary", metadata, Column("schema_name", String(255)),
+                       schema="public")
+    user_table = Table(
+        "user",
+        metadata,
+        Column("user_id", Integer, primary_key=True, autoincrement=True),
+        Column("email", String(255), unique=True),
+        Column("privilege", String(64)),
+        Column("password", String(255)),
+        Column("first_name", String(255)),
+        Column("last_name", String(255)),
+        Column("phone_number", String(64)),
+        schema="account",
+    )
+    metadata.create_all(engine, tables=[dictionary, user_table])
+
+    with engine.begin() as conn:
+        if not conn.execute(select(dictionary).where(dictionary.c.schema_name == GROUND_SCHEMA)).fetchone():
+            conn.execute(dictionary.insert().values(schema_name=GROUND_SCHEMA))
+        user = conn.execute(select(user_table).where(user_table.c.email == BENCH_EMAIL)).fetchone()
+        if user is None:
+            conn.execute(user_table.insert().values(
+                email=BENCH_EMAIL,
+                privilege="Admin",
+                password=get_hashed_password(BENCH_PASSWORD),
+                first_name="Bench",
+                last_name="Mark",
+            ))
+            user = conn.execute(select(user_table).where(user_table.c.email == BENCH_EMAIL)).fetchone()
+        user_schema = f"user_own_data_{user.user_id}"
+        conn.execute(DDL(f"DROP SCHEMA IF EXISTS {user_schema} CASCADE"))
+        conn.execute(DDL(f"CREATE SCHEMA {user_schema}"))
+
+    ground_names = [f"measurements_{i}" for i in range(ground_tables)]
+    for name in ground_names:
+        table = _measurement_table(metadata, name, GROUND_SCHEMA)
+        table.create(engine)
+        _insert_rows(engine, table, rng, ground_rows)
+
+    user_names = [f"samples_{i}" for i in range(user_tables)]
+    for name in user_names:
+        table = _measurement_table(metadata, name, user_schema)
+        table.create(engine)
+        _insert_rows(engine, table, rng, user_rows)
+
+    with engine.connect() as conn:
+        conn.execution_options(isolation_level="AUTOCOMMIT").execute(text("ANALYZE"))
+
+    return {
+        "ground_schema": GROUND_SCHEMA,
+        "ground_tables": ground_names,
+        "user_schema": user_schema,
+        "user_tables": user_names,
+    }
+
+
+def load_layout(engine: Engine) -> Dict[str, Any]:
+    """Describe the data left behind by a previous `seed` call."""
+    with engine.connect() as conn:
+        user_id = conn.execute(text('SELECT user_id FROM account."user" WHERE email = :email'),
+                               {"email": BENCH_EMAIL}).scalar()
+    if user_id is None:
+        raise RuntimeError("No benchmark data found, run without --skip-seed first")
+    inspector = inspect(engine)
+    user_schema = f"user_own_data_{user_id}"
+    return {
+        "ground_schema": GROUND_SCHEMA,
+        "ground_tables": sorted(inspector.get_table_names(schema=GROUND_SCHEMA)),
+        "user_schema": user_schema,
+        "user_tables": sorted(inspector.get_table_names(schema=user_schema)),
+    }